@@ -1,23 +1,27 @@
-from typing import Dict
+import re
+from typing import Dict, List
+
+
+# Matches one "key = value" line; blank lines and "#" comments never match.
+BLIZINI_LINE_RE = re.compile(r"^[ \t]*([^=#\r\n]+?)[ \t]*=[ \t]*(.*?)[ \t\r]*$", re.M)
 
 
 class BlizIni:
 	def __init__(self) -> None:
 		self.items: Dict[str, str] = {}
+		# All values seen for each key, in order. Repeated keys (eg. patch-entry)
+		# are joined once at the end, rather than re-concatenated on every line.
+		self._values: Dict[str, List[str]] = {}
 
 	def read_string(self, text: str) -> None:
-		for line in text.splitlines():
-			line = line.strip()
-			if not line or line.startswith("#"):
-				continue
-			key, _, value = line.partition("=")
-			key = key.strip()
-			value = value.strip()
-
-			if key in self.items:
-				self.items[key] += "\n" + value
+		values = self._values
+		for key, value in BLIZINI_LINE_RE.findall(text):
+			if key in values:
+				values[key].append(value)
 			else:
-				self.items[key] = value
+				values[key] = [value]
+
+		self.items.update((key, "\n".join(v)) for key, v in values.items())
 
 
 def load(text: str) -> Dict[str, str]:
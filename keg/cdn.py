@@ -1,20 +1,28 @@
+import hashlib
 import json
 import os
-from typing import IO
+from typing import IO, Dict, Optional, Set, Tuple, Type
 from urllib.parse import urljoin
 from uuid import uuid4
 
 import requests
+import urllib3
 
 from .archive import Archive, ArchiveIndex
 from .armadillo import ArmadilloKey
-from .configfile import BuildConfig, CDNConfig, PatchConfig
+from .configfile import BaseConfig, BuildConfig, CDNConfig, ConfigFile, PatchConfig
 from .exceptions import ArmadilloKeyNotFound, NetworkError
-from .utils import partition_hash, verify_data
+from .utils import HTTP_TIMEOUT, create_http_session, partition_hash, verify_data
 
 
 DEFAULT_CONFIG_PATH = "tpr/configs/data"
 
+# Size of the chunks read from a stream when writing it to disk
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Errors raised while reading a RemoteCDN item (its raw urllib3 stream)
+STREAM_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError)
+
 
 def get_config_path(key: str) -> str:
 	return f"/config/{partition_hash(key)}"
@@ -25,7 +33,7 @@ def get_data_path(key: str) -> str:
 
 
 def get_data_index_path(key: str) -> str:
-	return get_data_path(key) + ".index"
+	return f"/data/{partition_hash(key)}.index"
 
 
 def get_patch_path(key: str) -> str:
@@ -33,7 +41,7 @@ def get_patch_path(key: str) -> str:
 
 
 def get_patch_index_path(key: str) -> str:
-	return get_patch_path(key) + ".index"
+	return f"/patch/{partition_hash(key)}.index"
 
 
 def get_config_item_path(key: str) -> str:
@@ -98,34 +106,51 @@ class BaseCDN:
 
 
 class RemoteCDN(BaseCDN):
-	def __init__(self, server: str, path: str, config_path: str) -> None:
+	def __init__(
+		self,
+		server: str,
+		path: str,
+		config_path: str,
+		session: Optional[requests.Session] = None,
+	) -> None:
 		self.server = server
 		self.path = path
 		self.config_path = config_path
-
-	def _join_path(self, base_path: str, path: str):
-		# Final path always has to end with a "/"
-		# Actual path can't begin with a "/"
-		# urljoin("/foo/bar", "baz") => "/foo/baz"
-		# urljoin("/foo/bar/", "baz") => "/foo/bar/baz"
-		# urljoin("/foo/bar//", "baz") => "/foo/bar/baz"
-		# urljoin("/foo/bar/", "/baz") => "/baz"
-		return urljoin(base_path + "/", path.lstrip("/"))
-
-	def get_response(self, path: str) -> requests.Response:
-		url = urljoin(self.server, path)
-		ret = requests.get(url, stream=True)
+		self.session = session or create_http_session()
+		# Resolve the base URLs once; item paths are then simply appended.
+		self.item_url = self._join_url(self.path)
+		self.config_item_url = self._join_url(self.config_path)
+
+	def _join_url(self, base_path: str) -> str:
+		# The base path always has to end with a "/", so that item paths
+		# (relative, hashes, no "..") can simply be appended to it.
+		# urljoin("http://host/foo/", "tpr/wow/") => "http://host/foo/tpr/wow/"
+		# urljoin("http://host/foo/", "/tpr/wow/") => "http://host/tpr/wow/"
+		return urljoin(self.server, base_path.rstrip("/") + "/")
+
+	def get_url_response(self, url: str) -> requests.Response:
+		try:
+			ret = self.session.get(url, stream=True, timeout=HTTP_TIMEOUT)
+		except requests.RequestException as e:
+			raise NetworkError(f"Could not get {url}: {e}")
 		if ret.status_code != 200:
+			# Consume the (small) error body so the connection goes back to the pool
+			ret.content
+			ret.close()
 			raise NetworkError(f"Unexpected status code {ret.status_code} for {url}")
 		return ret
 
+	def get_raw(self, url: str) -> IO:
+		ret = self.get_url_response(url).raw
+		# The raw stream does not undo any Content-Encoding (gzip) by default
+		ret.decode_content = True
+		return ret
+
 	def get_item(self, path: str) -> IO:
-		final_path = self._join_path(self.path, path)
-		return self.get_response(final_path).raw
+		return self.get_raw(self.item_url + path.lstrip("/"))
 
 	def get_config_item(self, path: str) -> IO:
-		final_path = self._join_path(self.config_path, path)
-		return self.get_response(final_path).raw
+		return self.get_raw(self.config_item_url + path.lstrip("/"))
 
 
 class LocalCDN(BaseCDN):
@@ -137,6 +162,40 @@ class LocalCDN(BaseCDN):
 		self.armadillo_dir = armadillo_dir
 		self.temp_dir = temp_dir
 		self.armadillo_objects_dir = os.path.join(self.armadillo_dir, "objects")
+		self.configs_dir = os.path.join(self.base_dir, "configs", "data")
+		self._created_dirs: Set[str] = set()
+		# Parsed config files, by (class, key). They are content-addressed,
+		# so a parsed config never goes stale.
+		self._configs: Dict[Tuple[type, str], Tuple[BaseConfig, bool]] = {}
+
+	def ensure_dir(self, dirname: str) -> None:
+		"""
+		Creates `dirname` if needed. Directories already seen by this
+		instance are skipped without touching the filesystem.
+		"""
+		if dirname not in self._created_dirs:
+			os.makedirs(dirname, exist_ok=True)
+			self._created_dirs.add(dirname)
+
+	def _get_config(self, cls: Type[ConfigFile], key: str, verify: bool) -> ConfigFile:
+		"""
+		Returns the config file `key` parsed as `cls`, parsing it only once.
+		"""
+		cached = self._configs.get((cls, key))
+		if cached and (cached[1] or not verify):
+			return cached[0]  # type: ignore
+		ret = cls.from_bytes(self.fetch_config(key, verify=verify))
+		self._configs[cls, key] = ret, verify
+		return ret
+
+	def get_build_config(self, key: str, verify: bool = False) -> BuildConfig:
+		return self._get_config(BuildConfig, key, verify)
+
+	def get_cdn_config(self, key: str, verify: bool = False) -> CDNConfig:
+		return self._get_config(CDNConfig, key, verify)
+
+	def get_patch_config(self, key: str, verify: bool = False) -> PatchConfig:
+		return self._get_config(PatchConfig, key, verify)
 
 	def get_full_path(self, path: str) -> str:
 		return os.path.join(self.base_dir, path.lstrip("/"))
@@ -145,7 +204,7 @@ class LocalCDN(BaseCDN):
 		return os.path.join(self.armadillo_objects_dir, path.lstrip("/"))
 
 	def get_config_path(self, path: str) -> str:
-		return os.path.join(self.base_dir, "configs", "data", path.lstrip("/"))
+		return os.path.join(self.configs_dir, path.lstrip("/"))
 
 	def get_fragment_path(self, key: str) -> str:
 		return os.path.join(self.fragments_dir, partition_hash(key))
@@ -178,7 +237,7 @@ class LocalCDN(BaseCDN):
 		return self.exists(get_patch_index_path(key))
 
 	def has_config_item(self, key: str) -> bool:
-		return os.path.exists(self.get_config_path(f"/{partition_hash(key)}"))
+		return os.path.exists(self.get_config_path(get_config_item_path(key)))
 
 	def has_fragment(self, key: str) -> bool:
 		return os.path.exists(self.get_fragment_path(key))
@@ -199,34 +258,44 @@ class LocalCDN(BaseCDN):
 		Raises ArmadilloKeyNotFound if that key is not on disk.
 		"""
 		key_path = os.path.join(self.armadillo_dir, f"{key_name}.ak")
-		if not os.path.exists(key_path):
+		try:
+			with open(key_path, "rb") as f:
+				return ArmadilloKey(f.read())
+		except FileNotFoundError:
 			raise ArmadilloKeyNotFound(key_name)
 
-		with open(key_path, "rb") as f:
-			return ArmadilloKey(f.read())
-
-	def write_temp_file(self, data: bytes) -> str:
+	def write_temp_stream(self, fp: IO) -> Tuple[str, str]:
 		"""
-		Writes bytes to the temp store.
-		Returns the temporary file path.
+		Writes the contents of a file object to the temp store, in chunks,
+		without holding the whole file in memory.
+		The md5 digest is computed in the same pass.
+		Returns the temporary file path and the hex digest of its contents.
 		"""
 		temp_path = os.path.join(self.temp_dir, str(uuid4()))
-		if not os.path.exists(self.temp_dir):
-			os.makedirs(self.temp_dir)
-		with open(temp_path, "wb") as f:
-			f.write(data)
-
-		return temp_path
+		self.ensure_dir(self.temp_dir)
+		md5 = hashlib.md5()
+		f = open(temp_path, "wb")
+		try:
+			with f:
+				chunk = fp.read(STREAM_CHUNK_SIZE)
+				while chunk:
+					md5.update(chunk)
+					f.write(chunk)
+					chunk = fp.read(STREAM_CHUNK_SIZE)
+		except BaseException:
+			# Don't leave partial files behind in the temp store
+			os.remove(temp_path)
+			raise
+
+		return temp_path, md5.hexdigest()
 
 	def upgrade_temp_file(self, temp_path: str, path: str) -> None:
 		"""
 		"Upgrades" a temporary file to the LocalCDN at the given path.
 		"""
 		path = self.get_full_path(path)
-		dirname = os.path.dirname(path)
-		if not os.path.exists(dirname):
-			os.makedirs(dirname)
-		os.rename(temp_path, path)
+		self.ensure_dir(os.path.dirname(path))
+		os.replace(temp_path, path)
 
 	def has_encrypted_file(self, path: str) -> bool:
 		return os.path.exists(self.get_encrypted_path(path))
@@ -235,12 +304,10 @@ class LocalCDN(BaseCDN):
 		"""
 		Writes an encrypted file to the armadillo object store.
 		"""
-		temp_path = self.write_temp_file(fp.read())
+		temp_path, _ = self.write_temp_stream(fp)
 		crypt_path = self.get_encrypted_path(path)
-		dirname = os.path.dirname(crypt_path)
-		if not os.path.exists(dirname):
-			os.makedirs(dirname)
-		os.rename(temp_path, crypt_path)
+		self.ensure_dir(os.path.dirname(crypt_path))
+		os.replace(temp_path, crypt_path)
 
 
 class HTTPCacheWrapper:
@@ -248,11 +315,10 @@ class HTTPCacheWrapper:
 		self.fp = fp
 
 		dir_path = os.path.dirname(path)
-		if not os.path.exists(dir_path):
-			os.makedirs(dir_path)
+		os.makedirs(dir_path, exist_ok=True)
 
 		self._real_path = path
-		self._temp_path = path + ".keg_temp"
+		self._temp_path = f"{path}.{uuid4().hex}.keg_temp"
 		self._cache_file = open(self._temp_path, "wb")
 
 	def __enter__(self):
@@ -263,11 +329,19 @@ class HTTPCacheWrapper:
 		return False
 
 	def close(self):
-		self.read()
+		# Drain whatever is left, one chunk at a time
+		try:
+			while self.read(STREAM_CHUNK_SIZE):
+				pass
+		except BaseException:
+			self._cache_file.close()
+			os.remove(self._temp_path)
+			self.fp.close()
+			raise
 		self._cache_file.close()
 
 		# Atomic write&move; make sure there's no partially-written caches.
-		os.rename(self._temp_path, self._real_path)
+		os.replace(self._temp_path, self._real_path)
 
 		return self.fp.close()
 
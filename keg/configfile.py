@@ -1,5 +1,5 @@
 from collections import namedtuple
-from typing import Dict, Iterable, Type, TypeVar
+from typing import Dict, List, Type, TypeVar
 
 from . import blizini
 from .patch import PatchEntry
@@ -64,26 +64,15 @@ class CDNConfig(BaseConfig):
 		self.patch_archive_group = self._values.get("patch-archive-group", "")
 		self.file_index = self._values.get("file-index", "")
 		self.patch_file_index = self._values.get("patch-file-index", "")
-
-	@property
-	def archives(self):
-		return self._values.get("archives", "").split()
-
-	@property
-	def patch_archives(self):
-		return self._values.get("patch-archives", "").split()
+		self.archives: List[str] = self._values.get("archives", "").split()
+		self.patch_archives: List[str] = self._values.get("patch-archives", "").split()
 
 
 class PatchConfig(BaseConfig):
 	def __init__(self, _values) -> None:
 		super().__init__(_values)
 		self.patch = self._values.get("patch", "")
-
-	@property
-	def patch_entries(self) -> Iterable[PatchEntry]:
-		for entry in self._values.get("patch-entry", "").splitlines():
-			yield PatchEntry(entry)
-
-	@property
-	def patch_size(self):
-		return int(self._values.get("patch-size", "0"))
+		self.patch_entries: List[PatchEntry] = [
+			PatchEntry(entry) for entry in self._values.get("patch-entry", "").splitlines()
+		]
+		self.patch_size = int(self._values.get("patch-size", "0"))
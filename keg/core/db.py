@@ -297,14 +297,17 @@ class KegDB:
 			% (name, ", ".join(psvfile.header), ", ".join(["?"] * len(psvfile.header)))
 		)
 
-		rows = []
-		for i, row in enumerate(psvfile):
-			# Always ensure lowercase entry of hexes
-			cleaned_row = [
-				cell.lower() if "!HEX:" in h.upper() else cell
-				for cell, h in zip(row, psvfile.raw_header)
+		# Always ensure lowercase entry of hexes
+		is_hex = [("!HEX:" in h.upper()) for h in psvfile.raw_header]
+		rows = [
+			[
+				remote,
+				key,
+				i,
+				*[cell.lower() if hex_cell else cell for cell, hex_cell in zip(row, is_hex)],
 			]
-			rows.append([remote, key, i, *cleaned_row])
+			for i, row in enumerate(psvfile)
+		]
 
 		cursor.executemany(insert_tpl, rows)
 		self.commit()
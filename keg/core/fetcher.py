@@ -1,6 +1,6 @@
 import os
 from io import BytesIO
-from typing import IO, Generator, Optional, Set, Type
+from typing import IO, Dict, Generator, List, Optional, Set, Type
 
 from .. import blte, cdn
 from ..archive import ArchiveGroup
@@ -8,9 +8,9 @@ from ..armadillo import ArmadilloKey
 from ..blte import verify_blte_data
 from ..configfile import BuildConfig, CDNConfig, PatchConfig
 from ..encoding import EncodingFile
-from ..exceptions import ArmadilloKeyNotFound
+from ..exceptions import ArmadilloKeyNotFound, NetworkError
 from ..psvresponse import Versions
-from ..utils import verify_data
+from ..utils import verify_data, verify_digest
 from .keg import Keg
 
 
@@ -19,6 +19,10 @@ class FetchDirective:
 	A FetchDirective holds the logic to fetch exactly one remote item.
 	"""
 
+	# When set, the item is verified against the md5 digest of the whole file,
+	# computed while it is written to disk (no second read).
+	digest_object_name = ""
+
 	@classmethod
 	def key_exists(cls, key: str, local_cdn: cdn.LocalCDN) -> bool:
 		"""
@@ -40,22 +44,34 @@ class FetchDirective:
 		"""
 		path = self.get_full_path(self.key)
 		if not self.exists():
-			item = self.fetcher.remote_cdn.get_item(path)
-			if self.fetcher.decryption_key_name:
-				if self.fetcher.decryption_key:
-					# Decrypt the item into a BytesIO
-					item = BytesIO(self.fetcher.decryption_key.decrypt_object(self.key, item.read()))
-				else:
-					# We don't have the key? Store it in the crypt store...
-					if not self.fetcher.local_cdn.has_encrypted_file(path):
-						self.fetcher.local_cdn.write_encrypted_file(item, path)
-					return
-
-			temp_path = self.fetcher.local_cdn.write_temp_file(item.read())
-			if self.fetcher.verify:
+			try:
+				self.download(path)
+			except cdn.STREAM_ERRORS as e:
+				raise NetworkError(f"Error while downloading {path}: {e}")
+
+	def download(self, path: str) -> None:
+		"""
+		Downloads the item from the RemoteCDN into the LocalCDN.
+		"""
+		item = self.fetcher.remote_cdn.get_item(path)
+		if self.fetcher.decryption_key_name:
+			if self.fetcher.decryption_key:
+				# Decrypt the item into a BytesIO
+				item = BytesIO(self.fetcher.decryption_key.decrypt_object(self.key, item.read()))
+			else:
+				# We don't have the key? Store it in the crypt store...
+				if not self.fetcher.local_cdn.has_encrypted_file(path):
+					self.fetcher.local_cdn.write_encrypted_file(item, path)
+				return
+
+		temp_path, digest = self.fetcher.local_cdn.write_temp_stream(item)
+		if self.fetcher.verify:
+			if self.digest_object_name:
+				verify_digest(self.digest_object_name, digest, self.key)
+			else:
 				with open(temp_path, "rb") as f:
 					self.verify(f)
-			self.fetcher.local_cdn.upgrade_temp_file(temp_path, path)
+		self.fetcher.local_cdn.upgrade_temp_file(temp_path, path)
 
 	def exists(self) -> bool:
 		"""
@@ -68,22 +84,23 @@ class FetchDirective:
 
 
 class ProductConfigFetchDirective(FetchDirective):
+	get_full_path = staticmethod(cdn.get_config_item_path)  # type: ignore
+
 	@classmethod
 	def key_exists(cls, key: str, local_cdn: cdn.LocalCDN) -> bool:
 		return local_cdn.has_config_item(key)
 
-	def fetch(self, verify: bool = False) -> None:
-		path = cdn.get_config_item_path(self.key)
-		if not self.exists():
-			item = self.fetcher.remote_cdn.get_config_item(path)
-			self.fetcher.local_cdn.save_config_item(item, path)
+	def download(self, path: str) -> None:
+		item = self.fetcher.remote_cdn.get_config_item(path)
+		self.fetcher.local_cdn.save_config_item(item, path)
 
 
 class ConfigFetchDirective(FetchDirective):
+	digest_object_name = "config file"
 	get_full_path = staticmethod(cdn.get_config_path)  # type: ignore
 
 	def verify(self, fp: IO) -> None:
-		verify_data("config file", fp.read(), self.key, verify=True)
+		verify_data(self.digest_object_name, fp.read(), self.key, verify=True)
 
 
 class ArchiveFetchDirective(FetchDirective):
@@ -112,10 +129,11 @@ class DataIndexFetchDirective(FetchDirective):
 
 
 class PatchEntryFetchDirective(FetchDirective):
+	digest_object_name = "patch entry"
 	get_full_path = staticmethod(cdn.get_patch_path)  # type: ignore
 
 	def verify(self, fp: IO) -> None:
-		verify_data("patch entry", fp.read(), self.key, verify=True)
+		verify_data(self.digest_object_name, fp.read(), self.key, verify=True)
 
 
 class PatchArchiveFetchDirective(FetchDirective):
@@ -137,8 +155,10 @@ class PatchIndexFetchDirective(FetchDirective):
 
 
 class SignatureFileFetchDirective(LooseFileFetchDirective):
+	digest_object_name = "signature file"
+
 	def verify(self, fp: IO) -> None:
-		verify_data("signature file", fp.read(), self.key, verify=True)
+		verify_data(self.digest_object_name, fp.read(), self.key, verify=True)
 
 
 class FetchQueue:
@@ -251,22 +271,9 @@ class Fetcher:
 		- cdn_config
 		- patch_config
 		"""
-		product_config_key = self.version.product_config
-		self.product_config_queue.add(product_config_key)
+		self.product_config_queue.add(self.version.product_config)
 		yield Drain("product config", self.product_config_queue, self)
-		if self.version.product_config and self.local_cdn.has_config_item(product_config_key):
-			self.product_config = self.local_cdn.get_product_config(product_config_key)
-
-		if self.product_config:
-			decryption_key_name = (
-				self.product_config.get("all", {}).get("config", {}).get("decryption_key_name", "")
-			)
-			if decryption_key_name:
-				self.decryption_key_name = decryption_key_name
-				try:
-					self.decryption_key = self.local_cdn.get_decryption_key(decryption_key_name)
-				except ArmadilloKeyNotFound:
-					self.decryption_key = None
+		self.load_product_config()
 
 		self.config_queue.add(self.version.build_config)
 		self.config_queue.add(self.version.cdn_config)
@@ -292,6 +299,32 @@ class Fetcher:
 						patch_config_key, verify=self.verify
 					)
 
+	def load_product_config(self) -> None:
+		"""
+		Loads the ProductConfig from the LocalCDN, if it's there, and looks up
+		the decryption key it names.
+		Populates product_config, decryption_key_name and decryption_key.
+		Anything already loaded is not loaded again.
+		"""
+		product_config_key = self.version.product_config
+		if (
+			self.product_config is None
+			and product_config_key
+			and self.local_cdn.has_config_item(product_config_key)
+		):
+			self.product_config = self.local_cdn.get_product_config(product_config_key)
+
+		if self.product_config and not self.decryption_key_name:
+			decryption_key_name = (
+				self.product_config.get("all", {}).get("config", {}).get("decryption_key_name", "")
+			)
+			if decryption_key_name:
+				self.decryption_key_name = decryption_key_name
+				try:
+					self.decryption_key = self.local_cdn.get_decryption_key(decryption_key_name)
+				except ArmadilloKeyNotFound:
+					self.decryption_key = None
+
 	def fetch_metadata(self) -> Generator[Drain, None, None]:
 		"""
 		Fetches all metadata for the version:
@@ -378,3 +411,46 @@ class Fetcher:
 		yield Drain("loose files", self.loose_file_queue, self)
 		yield Drain("patch entries", self.patch_entry_queue, self)
 		yield Drain("patch archives", self.patch_archive_queue, self)
+
+
+def prefetch_product_configs(fetchers: List[Fetcher]) -> List[FetchDirective]:
+	"""
+	Returns the directives to fetch the ProductConfig of every fetcher's version,
+	without duplicates and skipping those already on disk.
+	Run them all (eg. concurrently) ahead of the fetchers' own fetch_config().
+	"""
+	ret: Dict[str, FetchDirective] = {}
+	for fetcher in fetchers:
+		key = fetcher.version.product_config
+		if key and key not in ret and not ProductConfigFetchDirective.key_exists(
+			key, fetcher.local_cdn
+		):
+			ret[key] = ProductConfigFetchDirective(key, fetcher)
+	return list(ret.values())
+
+
+def prefetch_configs(fetchers: List[Fetcher]) -> List[FetchDirective]:
+	"""
+	Returns the directives to fetch the BuildConfig and CDNConfig of every
+	fetcher's version, without duplicates and skipping those already on disk.
+	The ProductConfigs must have been fetched first, as they name the key used
+	to decrypt the configs.
+
+	Versions without a ProductConfig are left out: their decryption key can
+	only come from the legacy game blob, during the fetcher's fetch_config().
+	So are versions whose decryption key is missing: their configs can only go
+	to the encrypted store, which fetch_config() takes care of.
+	"""
+	ret: Dict[str, FetchDirective] = {}
+	for fetcher in fetchers:
+		if not fetcher.version.product_config:
+			continue
+		fetcher.load_product_config()
+		if fetcher.decryption_key_name and not fetcher.decryption_key:
+			continue
+		for key in (fetcher.version.build_config, fetcher.version.cdn_config):
+			if key and key not in ret and not ConfigFetchDirective.key_exists(
+				key, fetcher.local_cdn
+			):
+				ret[key] = ConfigFetchDirective(key, fetcher)
+	return list(ret.values())
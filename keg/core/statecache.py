@@ -1,4 +1,6 @@
+import json
 import os
+from typing import Dict
 
 from .. import psv
 from ..remote.http import StatefulResponse
@@ -9,17 +11,57 @@ from ..utils import atomic_write, ensure_dir_exists, partition_hash
 class StateCache:
 	def __init__(self, cache_dir: str) -> None:
 		self.cache_dir = cache_dir
+		self._dirs: Dict[str, str] = {}
 
 	def exists(self, name: str, key: str) -> bool:
 		return os.path.exists(self.get_full_path(name, key))
 
+	def get_dir(self, name: str) -> str:
+		ret = self._dirs.get(name)
+		if ret is None:
+			ret = self._dirs[name] = os.path.join(self.cache_dir, name)
+		return ret
+
 	def get_full_path(self, name: str, key: str) -> str:
-		return os.path.join(self.cache_dir, name, partition_hash(key))
+		return os.path.join(self.get_dir(name), partition_hash(key))
 
 	def read(self, name: str, key: str) -> str:
-		with open(self.get_full_path(name, key), "r") as f:
+		return self.read_bytes(name, key).decode("utf-8")
+
+	def read_bytes(self, name: str, key: str) -> bytes:
+		with open(self.get_full_path(name, key), "rb") as f:
 			return f.read()
 
+	def get_meta_path(self, name: str) -> str:
+		return os.path.join(self.get_dir(name), "meta.json")
+
+	def read_meta(self, name: str, remote: str) -> dict:
+		"""
+		Returns the metadata (digest, ETag, Last-Modified) stored for the
+		latest response of `name` from `remote`, or an empty dict if there is none.
+		"""
+		try:
+			with open(self.get_meta_path(name), "r") as f:
+				return json.load(f).get(remote, {})
+		except FileNotFoundError:
+			return {}
+
+	def write_meta(self, name: str, remote: str, meta: dict) -> int:
+		"""
+		Stores the metadata for the latest response of `name` from `remote`.
+		Responses for the same name from several remotes share one file,
+		keyed by remote.
+		"""
+		path = self.get_meta_path(name)
+		try:
+			with open(path, "r") as f:
+				all_meta = json.load(f)
+		except FileNotFoundError:
+			ensure_dir_exists(path)
+			all_meta = {}
+		all_meta[remote] = meta
+		return atomic_write(path, json.dumps(all_meta).encode())
+
 	def read_psv(self, name: str, key: str) -> psv.PSVFile:
 		data = self.read(name, key)
 		return psv.loads(data)
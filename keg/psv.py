@@ -1,8 +1,6 @@
-import csv
 import re
 from collections import namedtuple
-from io import StringIO
-from typing import IO, Any, List
+from typing import IO, Any, Iterable, List
 
 
 PSVRow = Any
@@ -29,22 +27,32 @@ class PSVFile:
 		return self.rows.__iter__()
 
 	def read_file(self, fp: IO) -> None:
-		def filter_row(row):
-			if row.startswith("#"):
-				# "#" is ignored (comment)
-				# But if it's ## seqn = 12345, we want to parse it
-				if row.startswith("## seqn = "):
-					if self.seqn:
-						raise ValueError(f"Duplicate seqn in psv: {row!r}")
-					self.seqn = parse_seqn(row)
-				return False
-			return True
-
-		reader = csv.reader(filter(filter_row, fp), delimiter="|")
-		self.raw_header = next(reader)
+		self.read_lines(fp.read().splitlines())
+
+	def read_comment(self, line: str) -> bool:
+		"""
+		Handles a "#" line (comment). Always returns False.
+		"""
+		# Comments are ignored, but if it's ## seqn = 12345, we want to parse it
+		if line.startswith("## seqn = "):
+			if self.seqn:
+				raise ValueError(f"Duplicate seqn in psv: {line!r}")
+			self.seqn = parse_seqn(line)
+		return False
+
+	def read_lines(self, lines: Iterable[str]) -> None:
+		# Data lines short-circuit before read_comment(), so the filter
+		# costs no function call per row.
+		rows = iter([
+			line for line in lines if line and (line[0] != "#" or self.read_comment(line))
+		])
+
+		# PSV has no quoting, so a plain split is enough to get the cells
+		self.raw_header = next(rows).split("|")
 		self.header = [f.split("!")[0] for f in self.raw_header]
 		self.row_format = namedtuple("PSVRow", self.header)
-		self.rows = [self.row_format(*row) for row in reader]
+		make_row = self.row_format._make
+		self.rows = [make_row(row.split("|")) for row in rows]
 
 
 def load(fp: IO) -> PSVFile:
@@ -54,4 +62,6 @@ def load(fp: IO) -> PSVFile:
 
 
 def loads(data: str) -> PSVFile:
-	return load(StringIO(data))
+	ret = PSVFile()
+	ret.read_lines(data.splitlines())
+	return ret
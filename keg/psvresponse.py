@@ -25,18 +25,9 @@ class CDNs(PSVResponse):
 		self.name = row.Name
 		self.path = row.Path
 		self.config_path = getattr(row, "ConfigPath", "")
-
-	@property
-	def all_servers(self) -> List[str]:
-		return self.servers + [f"http://{host}" for host in self.hosts]
-
-	@property
-	def hosts(self) -> List[str]:
-		return self._row.Hosts.split()
-
-	@property
-	def servers(self) -> List[str]:
-		return getattr(self._row, "Servers", "").split()
+		self.hosts: List[str] = row.Hosts.split()
+		self.servers: List[str] = getattr(row, "Servers", "").split()
+		self.all_servers = self.servers + [f"http://{host}" for host in self.hosts]
 
 
 class Versions(PSVResponse):
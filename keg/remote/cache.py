@@ -1,11 +1,11 @@
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..core.db import KegDB
 from ..core.statecache import StateCache
 from ..psv import PSVFile
 from ..psvresponse import CDNs, Versions
 from .base import BaseRemote
-from .http import HttpRemote
+from .http import HttpRemote, StatefulResponse
 from .ribbit import RibbitRemote
 
 
@@ -20,6 +20,38 @@ class CacheableRemote(BaseRemote):
 
 
 class CacheableHttpRemote(CacheableRemote, HttpRemote):
+	def get_response(
+		self, path: str, headers: Optional[Dict[str, str]] = None, cached_content: bytes = b""
+	) -> StatefulResponse:
+		"""
+		Performs a conditional request if a previous response for `path` from
+		this remote is in the state cache, reusing the cached content on a 304.
+		"""
+		name = path.lstrip("/")
+		meta = self.state_cache.read_meta(name, self.remote)
+		digest = meta.get("digest", "")
+		if digest:
+			try:
+				cached_content = self.state_cache.read_bytes(name, digest)
+			except FileNotFoundError:
+				pass
+			else:
+				headers = dict(headers or {})
+				if meta.get("etag"):
+					headers["If-None-Match"] = meta["etag"]
+				if meta.get("last_modified"):
+					headers["If-Modified-Since"] = meta["last_modified"]
+
+		response = super().get_response(path, headers=headers, cached_content=cached_content)
+		if not response.not_modified and (response.etag or response.last_modified):
+			self.state_cache.write_meta(name, self.remote, {
+				"digest": response.digest,
+				"etag": response.etag,
+				"last_modified": response.last_modified,
+			})
+
+		return response
+
 	def get_blob(self, name: str) -> Tuple[Any, Any]:
 		ret, response = super().get_blob(name)
 		self.state_cache.write_http_response(response)
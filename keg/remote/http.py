@@ -1,32 +1,49 @@
 import json
 from datetime import datetime
 from hashlib import md5
-from typing import Any, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import requests
 
 from .. import psv
 from ..exceptions import NetworkError
+from ..utils import HTTP_TIMEOUT, create_http_session
 from .base import BaseRemote
 
 
 class StatefulResponse:
-	def __init__(self, path: str, response: requests.Response) -> None:
+	def __init__(
+		self, path: str, response: requests.Response, cached_content: bytes = b""
+	) -> None:
 		self.path = path
-		self.content = response.content
+		self.etag = response.headers.get("ETag", "")
+		self.last_modified = response.headers.get("Last-Modified", "")
+		# A 304 is only usable if we have the content it refers to
+		self.not_modified = response.status_code == 304 and bool(cached_content)
+		self.content = cached_content if self.not_modified else response.content
 		self.timestamp = int(datetime.utcnow().timestamp())
 		self.digest = md5(self.content).hexdigest()
 
-		if response.status_code != 200:
+		if response.status_code != 200 and not self.not_modified:
 			raise NetworkError(f"Got status code {response.status_code} for {path!r}")
 
 
 class HttpRemote(BaseRemote):
 	supports_blobs = True
 
-	def get_response(self, path: str) -> StatefulResponse:
+	def __init__(self, remote: str) -> None:
+		super().__init__(remote)
+		self.session = create_http_session()
+
+	def get_response(
+		self, path: str, headers: Optional[Dict[str, str]] = None, cached_content: bytes = b""
+	) -> StatefulResponse:
 		url = self.remote + path
-		return StatefulResponse(path, requests.get(url))
+		try:
+			response = self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+		except requests.RequestException as e:
+			raise NetworkError(f"Could not get {url!r}: {e}")
+		return StatefulResponse(path, response, cached_content)
 
 	def get_blob(self, name: str) -> Tuple[Any, StatefulResponse]:
 		resp = self.get_response(f"/blob/{name}")
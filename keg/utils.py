@@ -1,22 +1,57 @@
 import hashlib
 import os
 from typing import IO
+from uuid import uuid4
+
+import requests
+from requests.adapters import HTTPAdapter
 
 from .exceptions import IntegrityVerificationError
 
 
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+HTTP_MAX_RETRIES = 3
+HTTP_TIMEOUT = 30
+HTTP_HEADERS = {
+	# Text payloads (versions, cdns, config files) compress well.
+	# Binary data is already compressed (BLTE) and is sent as is by the CDNs.
+	"Accept-Encoding": "gzip, deflate",
+	"User-Agent": "keg",
+}
+
+
+def create_http_session(pool_maxsize: int = HTTP_POOL_MAXSIZE) -> requests.Session:
+	"""
+	Returns a requests Session with a connection pool mounted for http and https,
+	so that consecutive requests to the same host reuse their connection.
+	Responses may be gzip-compressed on the wire.
+	`pool_maxsize` should be at least the number of threads sharing the session.
+	"""
+	session = requests.Session()
+	session.headers.update(HTTP_HEADERS)
+	adapter = HTTPAdapter(
+		pool_connections=HTTP_POOL_CONNECTIONS,
+		pool_maxsize=pool_maxsize,
+		max_retries=HTTP_MAX_RETRIES,
+	)
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+
 def atomic_write(path: str, content: bytes) -> int:
-	temp_path = path + ".keg_temp"
+	# Write to a uniquely-named temp file in the same directory, so that
+	# concurrent writers of the same path never share a partial file.
+	temp_path = f"{path}.{uuid4().hex}.keg_temp"
 	with open(temp_path, "wb") as f:
 		ret = f.write(content)
-	os.rename(temp_path, path)
+	os.replace(temp_path, path)
 	return ret
 
 
 def ensure_dir_exists(path: str) -> None:
-	dirname = os.path.dirname(path)
-	if not os.path.exists(dirname):
-		os.makedirs(dirname)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
 
 
 def partition_hash(hash: str) -> str:
@@ -27,13 +62,16 @@ def partition_hash(hash: str) -> str:
 
 def verify_data(object_name: str, data: bytes, key: str, verify: bool) -> bool:
 	if verify:
-		digest = hashlib.md5(data).hexdigest()
-		if digest != key:
-			raise IntegrityVerificationError(object_name, digest, key)
+		verify_digest(object_name, hashlib.md5(data).hexdigest(), key)
 
 	return True
 
 
+def verify_digest(object_name: str, digest: str, key: str) -> None:
+	if digest != key:
+		raise IntegrityVerificationError(object_name, digest, key)
+
+
 def read_cstr(fp: IO) -> str:
 	ret = []
 
@@ -1,6 +1,48 @@
 import os
-from typing import IO
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, Iterator, Type
+
+from keg.cdn import LocalCDN
 
 
 def get_resource(path: str, mode="r") -> IO:
 	return open(os.path.join(os.path.dirname(__file__), "res", path), mode)
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+	"""
+	Request handler that doesn't log requests to stderr.
+	"""
+	def log_message(self, *args):
+		pass
+
+
+def get_local_cdn(base_dir: str) -> LocalCDN:
+	"""
+	Returns a LocalCDN with all of its stores in `base_dir`.
+	"""
+	return LocalCDN(
+		os.path.join(base_dir, "objects"),
+		os.path.join(base_dir, "fragments"),
+		os.path.join(base_dir, "armadillo"),
+		os.path.join(base_dir, "tmp"),
+	)
+
+
+@contextmanager
+def serve(handler_class: Type[BaseHTTPRequestHandler]) -> Iterator[str]:
+	"""
+	Runs a local HTTP server with `handler_class` in a thread.
+	Yields the server's base url.
+	"""
+	server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+	# Don't wait on clients holding keep-alive connections open at shutdown
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	try:
+		yield f"http://127.0.0.1:{server.server_port}"
+	finally:
+		server.shutdown()
+		server.server_close()
@@ -0,0 +1,21 @@
+from keg import blizini
+
+
+def test_load():
+	text = "\n".join([
+		"# Build Configuration",
+		"",
+		"root = 0bd2b4e35b5b49dd2e4d1b9bd8bd1a0c",
+		"build-name=WOW-27291patch8.0.1_Retail",
+		"patch-entry = install abc",
+		"patch-entry = encoding def",
+		"empty =",
+	])
+	items = blizini.load(text)
+
+	assert items == {
+		"root": "0bd2b4e35b5b49dd2e4d1b9bd8bd1a0c",
+		"build-name": "WOW-27291patch8.0.1_Retail",
+		"patch-entry": "install abc\nencoding def",
+		"empty": "",
+	}
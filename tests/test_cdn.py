@@ -1,10 +1,158 @@
-from keg.cdn import RemoteCDN
+import gzip
+import os
+from hashlib import md5
+from io import BytesIO
 
+import pytest
 
-def test_remote_path_join():
+import keg.cdn
+from keg.cdn import STREAM_CHUNK_SIZE, HTTPCacheWrapper, RemoteCDN, get_config_path
+from keg.exceptions import NetworkError
+from keg.utils import HTTP_MAX_RETRIES, HTTP_POOL_MAXSIZE, create_http_session
+
+from . import QuietHandler, get_local_cdn, get_resource, serve
+
+
+def test_remote_item_url():
+	cdn = RemoteCDN("http://example.com", "/test/path", "/test/config-path")
+	assert cdn.item_url == "http://example.com/test/path/"
+	assert cdn.config_item_url == "http://example.com/test/config-path/"
+
+	for path in ("/path", "/path/", "path/", "path", "/path//"):
+		cdn = RemoteCDN("http://example.com", path, path)
+		assert cdn.item_url == "http://example.com/path/"
+
+	cdn = RemoteCDN("http://example.com", "", "/")
+	assert cdn.item_url == "http://example.com/"
+	assert cdn.config_item_url == "http://example.com/"
+
+	# Relative paths resolve against the server's path, absolute ones replace it
+	cdn = RemoteCDN("http://example.com/foo/", "tpr/wow", "/tpr/configs/data")
+	assert cdn.item_url == "http://example.com/foo/tpr/wow/"
+	assert cdn.config_item_url == "http://example.com/tpr/configs/data/"
+
+
+def test_remote_session_pooling():
 	cdn = RemoteCDN("http://example.com", "/test/path", "/test/config-path")
-	assert cdn._join_path("/path", "foo/") == "/path/foo/"
-	assert cdn._join_path("/path/", "foo/") == "/path/foo/"
-	assert cdn._join_path("/path/", "/foo/") == "/path/foo/"
-	assert cdn._join_path("path/", "/foo/") == "path/foo/"
-	assert cdn._join_path("path", "/foo/") == "path/foo/"
+	adapter = cdn.session.get_adapter("http://example.com/test/path")
+	assert adapter.poolmanager.connection_pool_kw["maxsize"] == HTTP_POOL_MAXSIZE
+	assert adapter.max_retries.total == HTTP_MAX_RETRIES
+
+	session = create_http_session(pool_maxsize=4)
+	cdn = RemoteCDN("https://example.com", "/test/path", "/test/config", session=session)
+	assert cdn.session is session
+	adapter = cdn.session.get_adapter("https://example.com/test/path")
+	assert adapter.poolmanager.connection_pool_kw["maxsize"] == 4
+
+
+def test_local_write_temp_stream(tmp_path):
+	cdn = get_local_cdn(str(tmp_path))
+	data = b"\x01" * (STREAM_CHUNK_SIZE * 2 + 3)
+	temp_path, digest = cdn.write_temp_stream(BytesIO(data))
+	with open(temp_path, "rb") as f:
+		assert f.read() == data
+	assert digest == md5(data).hexdigest()
+
+	cdn.upgrade_temp_file(temp_path, "/data/ab/cd/abcdef")
+	assert cdn.exists("/data/ab/cd/abcdef")
+
+
+def test_local_write_temp_stream_error(tmp_path):
+	class BrokenStream:
+		def __init__(self):
+			self.chunks = 0
+
+		def read(self, size=-1):
+			self.chunks += 1
+			if self.chunks > 1:
+				raise IOError("Connection lost")
+			return b"\x01" * STREAM_CHUNK_SIZE
+
+	cdn = get_local_cdn(str(tmp_path))
+	with pytest.raises(IOError):
+		cdn.write_temp_stream(BrokenStream())
+	assert os.listdir(cdn.temp_dir) == []
+
+
+def test_local_write_temp_stream_open_error(tmp_path, monkeypatch):
+	def failing_open(*args, **kwargs):
+		raise PermissionError("Permission denied")
+
+	cdn = get_local_cdn(str(tmp_path))
+	monkeypatch.setattr(keg.cdn, "open", failing_open, raising=False)
+	with pytest.raises(PermissionError):
+		cdn.write_temp_stream(BytesIO(b"\x01"))
+
+
+def test_http_cache_wrapper_error(tmp_path):
+	class BrokenStream(BytesIO):
+		def read(self, size=-1):
+			raise IOError("Connection lost")
+
+	fp = BrokenStream()
+	path = str(tmp_path / "cache" / "versions")
+	wrapper = HTTPCacheWrapper(fp, path)
+	with pytest.raises(IOError):
+		wrapper.close()
+	assert fp.closed
+	assert os.listdir(tmp_path / "cache") == []
+
+
+def test_remote_connection_error():
+	# Nothing listens on port 1 of localhost
+	cdn = RemoteCDN("http://127.0.0.1:1", "/test/path", "/test/config-path")
+	cdn.session.get_adapter("http://127.0.0.1:1").max_retries.total = 0
+	with pytest.raises(NetworkError):
+		cdn.get_item("/config/ab/cd/abcd")
+
+
+def test_local_config_cache(tmp_path):
+	cdn = get_local_cdn(str(tmp_path))
+	key = "f7e68fd6611317050be908301b944855"
+	with get_resource(f"buildconfig/{key}", "rb") as f:
+		cdn.save_item(f, get_config_path(key))
+
+	build_config = cdn.get_build_config(key)
+	assert cdn.get_build_config(key) is build_config
+	assert cdn.get_build_config(key, verify=True) is not build_config
+
+
+def test_remote_gzip_item():
+	class Handler(QuietHandler):
+		def do_GET(self):
+			body = gzip.compress(b"archives = \n")
+			self.send_response(200)
+			self.send_header("Content-Encoding", "gzip")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+	with serve(Handler) as url:
+		cdn = RemoteCDN(url, "/tpr/test", "")
+		with cdn.get_item("/config/ab/cd/abcd") as item:
+			assert item.read() == b"archives = \n"
+
+
+def test_remote_error_releases_connection():
+	connections = []
+
+	class Handler(QuietHandler):
+		protocol_version = "HTTP/1.1"
+
+		def setup(self):
+			super().setup()
+			connections.append(self.client_address)
+
+		def do_GET(self):
+			body = b"Not Found"
+			self.send_response(404)
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+	with serve(Handler) as url:
+		cdn = RemoteCDN(url, "/tpr/test", "")
+		for i in range(5):
+			with pytest.raises(NetworkError):
+				cdn.get_item("/config/ab/cd/abcd")
+	assert len(connections) == 1
@@ -1,3 +1,8 @@
+import os
+from io import BytesIO
+
+import pytest
+
 from keg.core.db import KegDB
 
 
@@ -8,3 +13,120 @@ def test_db_tables():
 	cursor = db.cursor()
 	cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'")
 	assert cursor.fetchone() == (5,)
+
+
+def test_state_cache_meta(tmp_path):
+	from keg.core.statecache import StateCache
+
+	cache = StateCache(str(tmp_path))
+	assert cache.read_meta("versions", "http://a") == {}
+
+	meta_a = {"digest": "a716783d0bfb5b6ee84ac3f7c7e42b1f", "etag": '"abc"'}
+	meta_b = {"digest": "7a53c9036832987d60ef2336a8a714ce", "etag": '"def"'}
+	cache.write_meta("versions", "http://a", meta_a)
+	cache.write_meta("versions", "http://b", meta_b)
+	assert cache.read_meta("versions", "http://a") == meta_a
+	assert cache.read_meta("versions", "http://b") == meta_b
+	assert cache.read_meta("versions", "http://c") == {}
+
+
+def test_state_cache_read_psv(tmp_path):
+	from keg.core.statecache import StateCache
+
+	from . import get_resource
+
+	with get_resource("versions.psv", "rb") as f:
+		content = f.read()
+
+	cache = StateCache(str(tmp_path))
+	cache.write("versions", "7a53c9036832987d60ef2336a8a714ce", content)
+	assert cache.read("versions", "7a53c9036832987d60ef2336a8a714ce") == content.decode()
+
+	psvfile = cache.read_psv("versions", "7a53c9036832987d60ef2336a8a714ce")
+	assert len(psvfile.rows) == 7
+
+
+def test_prefetch_directives(tmp_path):
+	from keg import psv
+	from keg.cdn import get_config_item_path
+	from keg.core.fetcher import (
+		ConfigFetchDirective, Fetcher, prefetch_configs, prefetch_product_configs
+	)
+	from keg.core.keg import Keg
+	from keg.psvresponse import Versions
+
+	from . import get_resource
+
+	keg = Keg(str(tmp_path))
+	with get_resource("versions.psv") as f:
+		versions = [Versions(row) for row in psv.load(f)]
+	fetchers = [Fetcher(v, keg.local_cdn, None, keg) for v in versions]
+
+	product_configs = prefetch_product_configs(fetchers)
+	assert sorted(d.key for d in product_configs) == sorted(
+		{v.product_config for v in versions}
+	)
+
+	configs = prefetch_configs(fetchers)
+	assert all(isinstance(d, ConfigFetchDirective) for d in configs)
+	assert sorted(d.key for d in configs) == sorted(
+		{v.build_config for v in versions} | {v.cdn_config for v in versions}
+	)
+
+	# Configs that can't be decrypted are left to the fetchers' own fetch_config()
+	product_config = b'{"all": {"config": {"decryption_key_name": "missing"}}}'
+	for key in {v.product_config for v in versions}:
+		keg.local_cdn.save_config_item(BytesIO(product_config), get_config_item_path(key))
+	fetchers = [Fetcher(v, keg.local_cdn, None, keg) for v in versions]
+	assert prefetch_configs(fetchers) == []
+
+	fetcher = fetchers[0]
+	assert fetcher.decryption_key_name == "missing"
+	loaded = fetcher.product_config
+	fetcher.load_product_config()
+	assert fetcher.product_config is loaded
+
+
+def test_db_write_psv():
+	from keg import psv
+
+	from . import get_resource
+
+	db = KegDB(":memory:")
+	db.create_tables()
+	with get_resource("versions.psv") as f:
+		psvfile = psv.load(f)
+	db.write_psv(psvfile, "7a53c9036832987d60ef2336a8a714ce", "test", "versions")
+
+	assert db.get_build_configs(remote="test") == [
+		("4eb3986466ec004ffa1755642b375a87", "fb445ca0526699c61a92830ab894a985")
+	]
+
+
+def test_fetch_truncated_item(tmp_path):
+	from keg.cdn import RemoteCDN
+	from keg.core.fetcher import ConfigFetchDirective, Fetcher, ProductConfigFetchDirective
+	from keg.core.keg import Keg
+	from keg.exceptions import NetworkError
+
+	from . import QuietHandler, serve
+
+	class Handler(QuietHandler):
+		def do_GET(self):
+			# Announce more data than is sent, then drop the connection
+			self.send_response(200)
+			self.send_header("Content-Length", "100000")
+			self.end_headers()
+			self.wfile.write(b"\x01" * 1000)
+
+	keg = Keg(str(tmp_path))
+	with serve(Handler) as url:
+		remote_cdn = RemoteCDN(url, "/tpr/test", "/tpr/configs")
+		fetcher = Fetcher(None, keg.local_cdn, remote_cdn, keg)
+		for directive_class in (ConfigFetchDirective, ProductConfigFetchDirective):
+			with pytest.raises(NetworkError):
+				directive_class("a716783d0bfb5b6ee84ac3f7c7e42b1f", fetcher).fetch()
+
+	assert not keg.local_cdn.has_config("a716783d0bfb5b6ee84ac3f7c7e42b1f")
+	assert not keg.local_cdn.has_config_item("a716783d0bfb5b6ee84ac3f7c7e42b1f")
+	assert os.listdir(keg.temp_dir) == []
@@ -26,3 +26,19 @@ def test_read_psv():
 		"8.0.1.27291",
 		"19a26886b5b1c264de1177ae6aa7fbf5",
 	]
+
+
+def test_loads_psv():
+	from keg import psv
+
+	data = psv.loads(
+		"Name!STRING:0|Path!STRING:0|Hosts!STRING:0\r\n"
+		"## seqn = 1234\r\n"
+		"us|tpr/wow|a.example.com b.example.com\r\n"
+		"eu|tpr/wow|\r\n"
+	)
+
+	assert data.seqn == 1234
+	assert data.header == ["Name", "Path", "Hosts"]
+	assert data.rows[0].Hosts == "a.example.com b.example.com"
+	assert list(data.rows[1]) == ["eu", "tpr/wow", ""]
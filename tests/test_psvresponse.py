@@ -12,6 +12,7 @@ def test_read_old_cdns():
 		assert cdn.name
 		assert cdn.path
 		assert not cdn.config_path
+		assert cdn.all_servers == [f"http://{host}" for host in cdn.hosts]
 
 
 def test_read_old_versions():
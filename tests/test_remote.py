@@ -0,0 +1,73 @@
+
+import pytest
+import requests
+
+from keg.core.db import KegDB
+from keg.core.statecache import StateCache
+from keg.exceptions import NetworkError
+from keg.remote.cache import CacheableHttpRemote
+from keg.remote.http import StatefulResponse
+
+from . import QuietHandler, serve
+
+
+def test_stateful_response_not_modified():
+	response = requests.Response()
+	response.status_code = 304
+	response.headers["ETag"] = '"abc"'
+	response._content = b""
+
+	resp = StatefulResponse("/versions", response, cached_content=b"cached")
+	assert resp.not_modified
+	assert resp.content == b"cached"
+	assert resp.etag == '"abc"'
+
+	with pytest.raises(NetworkError):
+		StatefulResponse("/versions", response)
+
+
+def test_conditional_requests_per_remote(tmp_path):
+	class Handler(QuietHandler):
+		def do_GET(self):
+			# Answer 304 to any conditional request, whatever it refers to
+			if self.headers.get("If-Modified-Since"):
+				self.send_response(304)
+				self.end_headers()
+				return
+			build_config = "aaaa" if self.path.startswith("/a/") else "bbbb"
+			body = f"Region!STRING:0|BuildConfig!HEX:16\nus|{build_config}\n".encode()
+			self.send_response(200)
+			self.send_header("Last-Modified", "Mon, 01 Jan 2018 00:00:00 GMT")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+	db = KegDB(":memory:")
+	db.create_tables()
+	state_cache = StateCache(str(tmp_path))
+
+	with serve(Handler) as url:
+		remote_a, remote_b = [
+			CacheableHttpRemote(
+				url + path, cache_dir=str(tmp_path), cache_db=db, state_cache=state_cache
+			) for path in ("/a", "/b")
+		]
+		assert list(remote_a.get_psv("versions")[0].rows[0]) == ["us", "aaaa"]
+		# Remote B must not be sent remote A's validators
+		assert list(remote_b.get_psv("versions")[0].rows[0]) == ["us", "bbbb"]
+
+		# Both are now served from their own cache on 304
+		psvfile, response = remote_a.get_psv("versions")
+		assert response.not_modified
+		assert list(psvfile.rows[0]) == ["us", "aaaa"]
+		psvfile, response = remote_b.get_psv("versions")
+		assert response.not_modified
+		assert list(psvfile.rows[0]) == ["us", "bbbb"]
+
+	for remote in (remote_a, remote_b):
+		key = db.get_response_key(remote.remote, "/versions")
+		cursor = db.cursor()
+		cursor.execute(
+			"SELECT count(*) FROM versions WHERE remote = ? AND key = ?", (remote.remote, key)
+		)
+		assert cursor.fetchone() == (1,)